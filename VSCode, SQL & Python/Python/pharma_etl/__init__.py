@@ -0,0 +1,30 @@
+"""Pharma OTC sales ETL package — see pipeline.py for the implementation.
+
+Run it with `python -m pharma_etl` (or via the legacy etl_pipeline.py shim).
+"""
+
+from pharma_etl.pipeline import (
+    get_engine,
+    load_view,
+    stream_view,
+    export_csv,
+    export_csv_chunks,
+    export_parquet,
+    copy_view_to_csv,
+    fetch_kpis,
+    compute_kpis,
+    run_pipeline,
+)
+
+__all__ = [
+    "get_engine",
+    "load_view",
+    "stream_view",
+    "export_csv",
+    "export_csv_chunks",
+    "export_parquet",
+    "copy_view_to_csv",
+    "fetch_kpis",
+    "compute_kpis",
+    "run_pipeline",
+]
@@ -0,0 +1,6 @@
+"""Entry point for `python -m pharma_etl`."""
+
+from pharma_etl.pipeline import run_pipeline
+
+if __name__ == "__main__":
+    run_pipeline()